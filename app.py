@@ -1,13 +1,23 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+import asyncio
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 import json
+import logging
 import os
+import sqlite3
+import queue
 import time
+import atexit
+import threading
+from html import unescape
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
 
 # Attempt to import requests_html, a fallback for some dynamic sites
 try:
@@ -15,199 +25,587 @@ try:
 except ImportError:
     HTMLSession = None
 
+# orjson is optional; it only speeds up the JSONL export
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 # --- Configuration ---
-DATA_FILE = "faqs.json"
+DB_FILE = "faqs.db"
+CACHE_TTL = float(os.getenv("CACHE_TTL", 3600))  # Seconds before a cached entry is revalidated
+WRITE_COALESCE = 0.2  # Seconds the cache writer waits to batch up more writes
+MAX_CONCURRENCY = 20  # Max URLs fetched at the same time
+POOL_SIZE = 32  # Max open keep-alive connections in the shared session
+MAX_BYTES = 2_000_000  # Bodies are cut here; FAQ text sits well before trailing JS blobs
+CHUNK_SIZE = 65536
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3  # Seconds, doubled after every failed attempt
+# Separate connect and read timeouts, like requests' (connect, read) tuple
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=3.05, sock_read=10)
+# Selenium server (e.g. the docker-compose service); local Chrome when unset
+SELENIUM_URL = os.getenv("SELENIUM_URL")
+# Browsers kept open at once; match SE_NODE_MAX_SESSIONS on the server
+DRIVER_POOL_SIZE = int(os.getenv("SELENIUM_SESSIONS", 4 if SELENIUM_URL else 1))
+# Longest wait (seconds) for client-rendered FAQ content after the load event
+CONTENT_TIMEOUT = float(os.getenv("SELENIUM_CONTENT_TIMEOUT", 15))
+FAQ_CONTAINERS = "dt, h2, h3, article"
+CHROME_SPEED_FLAGS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-extensions",
+    "--disable-features=TranslateUI,BlinkGenPropertyTrees",
+    "--disable-ipc-flooding-protection",
+    "--mute-audio",
+    "--hide-scrollbars",
+    "--metrics-recording-only",
+)
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate",
+}
 
 # --- Helper Functions ---
 
+# [n] citation markers, compiled once
+_CITATION_RE = re.compile(r"\[\d+\]")
+
 def clean_text(text: str) -> str:
     # Clean unwanted symbols and normalize spaces.
-    text = re.sub(r"[¶Â]", "", text)
-    text = re.sub(r"\[\d+\]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"\xa0", " ", text)
-    return text.strip()
+    # Single characters go through str.replace (no regex), and str.split()
+    # collapses whitespace (\xa0 included) and strips in C.
+    text = text.replace("¶", "").replace("Â", "")
+    return " ".join(_CITATION_RE.sub("", text).split())
 
-def get_page_source_selenium(url: str) -> str:
-    # Fetches the page source using a headless Selenium browser.
-    
+def start_driver():
+    """Starts a headless Chrome, on the Selenium server if SELENIUM_URL is set."""
     chrome_options = Options()
-    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.get(url)
-    time.sleep(5)  # Wait for JS to load
+    # Only the text matters, so skip images and background work
+    for arg in CHROME_SPEED_FLAGS:
+        chrome_options.add_argument(arg)
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
     
-    page_source = driver.page_source
-    driver.quit()
+    if SELENIUM_URL:
+        driver = webdriver.Remote(command_executor=SELENIUM_URL, options=chrome_options, keep_alive=True)
+    else:
+        driver = webdriver.Chrome(options=chrome_options, keep_alive=True)
+    atexit.register(quit_driver, driver)
+    return driver
+
+def quit_driver(driver):
+    """Quits a browser, ignoring ones that already crashed or were closed."""
+    try:
+        driver.quit()
+    except Exception:
+        pass  # Already gone, or the Selenium server is unreachable
+
+def wait_for_page(driver):
+    """Waits until client-side rendering has added FAQ-like content and settled."""
+    # A page shell's own headings appear long before the FAQ is rendered, so the
+    # page text must also have stopped growing between two polls.
+    last_length = [-1]
+
+    def content_settled(driver):
+        if not driver.find_elements(By.CSS_SELECTOR, FAQ_CONTAINERS):
+            return False
+        length = driver.execute_script("return document.body.innerText.length")
+        settled, last_length[0] = length == last_length[0], length
+        return settled
+
+    try:
+        WebDriverWait(driver, CONTENT_TIMEOUT, poll_frequency=0.5).until(content_settled)
+    except TimeoutException:
+        pass  # Use whatever has rendered so far
+
+@st.cache_resource(show_spinner=False)
+def get_driver_pool() -> queue.Queue:
+    """Slots for the browsers shared by every Selenium fallback."""
+    pool = queue.Queue()
+    for _ in range(DRIVER_POOL_SIZE):
+        pool.put(None)  # Browsers are started on first use
+    return pool
+
+def get_page_source_selenium(url: str) -> str:
+    # Fetches the page source using a pooled headless Selenium browser.
+    pool = get_driver_pool()
+    driver = pool.get()  # Blocks until a browser is free
+    try:
+        if driver is None:
+            driver = start_driver()
+        driver.get(url)
+        wait_for_page(driver)  # Wait for JS to load
+        page_source = driver.page_source
+        
+        # Reset the browser so the next extraction starts clean
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+    except Exception:
+        # The browser or the connection to the Selenium server may be gone
+        # (urllib3 errors are not WebDriverExceptions); start a fresh one next time
+        if driver is not None:
+            quit_driver(driver)
+        driver = None
+        raise
+    finally:
+        pool.put(driver)
     return page_source
 
+def get_page_source_requests_html(url: str) -> str:
+    # Renders the page with requests_html. Runs in a worker thread, so it
+    # needs an event loop of its own for pyppeteer.
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    session = HTMLSession()
+    try:
+        r = session.get(url)
+        r.html.render(timeout=20, sleep=5)
+        return r.html.html
+    finally:
+        session.close()
+
+# Tag lists and patterns used on every page, built once at import time
+_NOISE_TAGS = ("script", "style", "nav", "footer", "header", "form",
+               "noscript", "iframe", "button", "input", "aside")
+_HEADINGS = ("h1", "h2", "h3", "h4")
+_ANSWER_TAGS = ("p", "div", "li", "span")
+_TEXT_TAGS = ("p", "div", "li", "span", "h2", "h3", "h4", "strong", "b")
+_DL_ITEMS = ("dt", "dd")
+_DL_CHILDREN = ("dt", "dd", "div")
+# Only these subtrees are built while parsing. <head> and anything else
+# outside them (top-level scripts, styles, SVGs...) is skipped entirely.
+# Layout containers stay so headings keep their siblings, and the noisy
+# containers stay so remove_noisy_tags can still drop their contents.
+_PARSE_ONLY = SoupStrainer([
+    "dl", "dt", "dd", "h1", "h2", "h3", "h4", "p", "div", "li", "ul", "ol",
+    "span", "strong", "b", "article", "section", "main", "table",
+    "nav", "footer", "header", "aside", "form",
+])
+# This is a robust regex that works for multi-line Q/A. Both markers are
+# required and must start a line, so "FAQ:" or "Java:" never count as one.
+_QA_RE = re.compile(
+    r"^[ \t]*Q(?:uestion)?:\s*(.*?)\n[ \t]*A(?:nswer)?:\s*(.*?)(?=\n[ \t]*Q(?:uestion)?:|\Z)",
+    re.I | re.S | re.M,
+)
+_QA_BYTES_RE = re.compile(_QA_RE.pattern.encode(), re.I | re.S | re.M)
+# A Q:/Question: marker at the start of a line or of an element's text
+_QA_MARKER_BYTES_RE = re.compile(rb"(?:>|\n)[ \t]*Q(?:uestion)?:", re.I)
+# Comments, <head> and noisy elements (scripts, styles, nav...) are dropped
+# whole, like get_text, the strainer and remove_noisy_tags do in the DOM path
+# ("input" has no body)
+_NOISE_BYTES_RE = re.compile(
+    rb"<!--.*?-->|<(%s)\b.*?</\1\s*>" % b"|".join(t.encode() for t in ("head",) + _NOISE_TAGS if t != "input"),
+    re.I | re.S,
+)
+_TAG_BYTES_RE = re.compile(rb"<[^>]+>")
+
 def remove_noisy_tags(soup):
     """Removes irrelevant tags to clean up the HTML."""
-    for tag in soup(["script", "style", "nav", "footer", "header", "form",
-                     "noscript", "iframe", "button", "input", "aside"]):
+    for tag in soup(_NOISE_TAGS):
         tag.decompose()
     return soup
 
 # --- Extraction Logic (Combined and Prioritized) ---
 
-def extract_faqs_from_html(html: str) -> list:
-    """Combines extraction logic from all scripts."""
+_JSONLD_RE = re.compile(r"<script[^>]+application/ld\+json[^>]*>(.*?)</script>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def _iter_jsonld_questions(node):
+    """Yields every schema.org Question object inside a parsed JSON-LD block."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _iter_jsonld_questions(item)
+    elif isinstance(node, dict):
+        node_type = node.get("@type")
+        if node_type == "Question" or (isinstance(node_type, list) and "Question" in node_type):
+            yield node
+            return
+        for value in node.values():
+            yield from _iter_jsonld_questions(value)
+
+def _jsonld_text(value) -> str:
+    """Answer texts may embed HTML markup and entities."""
+    return clean_text(unescape(_TAG_RE.sub(" ", str(value or ""))))
+
+def extract_faqs_from_jsonld(html: str) -> list:
+    """Reads FAQPage structured data straight from the raw HTML."""
     faqs = []
-    
-    soup = BeautifulSoup(html, "html.parser")
-    soup = remove_noisy_tags(soup)
-    text = soup.get_text(separator="\n", strip=True)
-    
-    # 1. Look for explicit Q: and A: patterns (from test.py & model.py)
-    # This is a robust regex that works for multi-line Q/A.
-    qna = re.findall(r"Q(?:uestion)?:?\s*(.*?)(?:A(?:nswer)?:)?\s*(.*?)(?=\nQ|\Z)", text, re.I | re.S)
-    for q, a in qna:
-        if q.strip() and a.strip():
-            faqs.append({"question": clean_text(q), "answer": clean_text(a)})
+    for match in _JSONLD_RE.finditer(html):
+        try:
+            # strict=False: raw newlines inside answer strings are common
+            data = json.loads(match.group(1), strict=False)
+        except ValueError:
+            continue
+        for question in _iter_jsonld_questions(data):
+            answer = question.get("acceptedAnswer") or question.get("suggestedAnswer")
+            if isinstance(answer, list):
+                answer = answer[0] if answer else None
+            if not isinstance(answer, dict):
+                continue
+            q = _jsonld_text(question.get("name"))
+            a = _jsonld_text(answer.get("text"))
+            if q and a:
+                faqs.append({"question": q, "answer": a})
+    return faqs
 
-    if faqs:
-        return faqs
+def _mode_qa_text(soup) -> list:
+    """1. Look for explicit Q: and A: patterns (from test.py & model.py)."""
+    text = soup.get_text(separator="\n", strip=True)
+    return [{"question": clean_text(q), "answer": clean_text(a)}
+            for q, a in _QA_RE.findall(text) if q.strip() and a.strip()]
 
-    # 2. Look for <dt> and <dd> tags (from test.py & model.py)
-    for dt, dd in zip(soup.find_all("dt"), soup.find_all("dd")):
-        q = dt.get_text(strip=True)
-        a = dd.get_text(strip=True)
-        if q and a:
-            faqs.append({"question": q, "answer": a})
+def _dl_items(dl):
+    """Yields the <dt>/<dd> items of a <dl>, including HTML5 <div> groups."""
+    for child in dl.find_all(_DL_CHILDREN, recursive=False):
+        if child.name == "div":
+            yield from child.find_all(_DL_ITEMS, recursive=False)
+        else:
+            yield child
 
-    if faqs:
-        return faqs
+def _mode_definition_lists(soup) -> list:
+    """2. Look for <dt> and <dd> tags (from test.py & model.py)."""
+    faqs = []
+    # Walk each <dl> once, pairing every <dt> with the <dd> that follows it.
+    for dl in soup.find_all("dl"):
+        q = ""
+        for child in _dl_items(dl):
+            if child.name == "dt":
+                q = child.get_text(strip=True)
+            elif q:
+                a = child.get_text(strip=True)
+                if a:
+                    faqs.append({"question": q, "answer": a})
+                q = ""
+    return faqs
 
-    # 3. Look for header followed by a paragraph (from test.py & model.py)
-    headings = soup.find_all(["h1", "h2", "h3", "h4"])
-    for heading in headings:
+def _mode_headings(soup) -> list:
+    """3. Look for header followed by a paragraph (from test.py & model.py)."""
+    faqs = []
+    for heading in soup.find_all(_HEADINGS):
         next_tag = heading.find_next_sibling()
-        if next_tag and next_tag.name in ["p", "div", "li", "span"]:
+        if next_tag and next_tag.name in _ANSWER_TAGS:
             q = heading.get_text(strip=True)
             a = next_tag.get_text(strip=True)
             if q.endswith("?") and a:
                 faqs.append({"question": q, "answer": a})
+    return faqs
 
-    if faqs:
-        return faqs
-
-    # 4. Fallback to a broader search (from app.py)
-    texts = [t.get_text(" ", strip=True) for t in soup.find_all(["p", "div", "li", "span", "h2", "h3", "h4", "strong", "b"])]
-    
-    questions = []
-    answers = []
+def _mode_text_blocks(soup) -> list:
+    """4. Fallback to a broader search (from app.py)."""
+    texts = [t.get_text(" ", strip=True) for t in soup.find_all(_TEXT_TAGS)]
     
+    faqs = []
     for i in range(len(texts) - 1):
         if (texts[i].startswith("Q") or texts[i].endswith("?")) and texts[i+1].startswith("A"):
-            questions.append(texts[i])
-            answers.append(texts[i+1])
+            faqs.append({"question": texts[i], "answer": texts[i+1]})
+    return faqs
+
+# Highest priority first
+_EXTRACTION_MODES = (_mode_qa_text, _mode_definition_lists, _mode_headings, _mode_text_blocks)
+
+def extract_faqs_from_dom(html: str, modes=_EXTRACTION_MODES) -> list:
+    """Parses the HTML once and runs the given DOM extraction modes."""
+    soup = BeautifulSoup(html, "lxml", parse_only=_PARSE_ONLY)
+    soup = remove_noisy_tags(soup)
     
-    for q, a in zip(questions, answers):
-        faqs.append({"question": q, "answer": a})
-        
+    for mode in modes:
+        faqs = mode(soup)
+        if faqs:
+            return faqs
+    return []
+
+def extract_faqs_from_html(html: str) -> list:
+    """Combines extraction logic from all scripts."""
+    # 0. FAQPage JSON-LD: authoritative and needs no DOM at all
+    faqs = extract_faqs_from_jsonld(html)
+    if faqs:
+        return faqs
+    return extract_faqs_from_dom(html)
+
+def _has_qa_markers(body: bytes) -> bool:
+    """Cheap check for Q:/A: style markers in the raw response body."""
+    return _QA_MARKER_BYTES_RE.search(body) is not None
+
+def _extract_qa_from_bytes(body: bytes, charset: str) -> list:
+    """Mode 1 run on the tag-stripped raw body, without building a DOM."""
+    # Tags become line breaks, like get_text(separator="\n") in the DOM path
+    text = _TAG_BYTES_RE.sub(b"\n", _NOISE_BYTES_RE.sub(b" ", body))
+    faqs = []
+    for q, a in _QA_BYTES_RE.findall(text):
+        q = clean_text(unescape(_decode(q, charset)))
+        a = clean_text(unescape(_decode(a, charset)))
+        if q and a:
+            faqs.append({"question": q, "answer": a})
     return faqs
 
-def fetch_and_extract_all(url: str) -> list:
-    """Fetches the HTML using a tiered approach and extracts FAQs."""
+def extract_faqs_from_body(body: bytes, charset: str) -> list:
+    """Same as extract_faqs_from_html, for a raw HTTP body."""
+    html = _decode(body, charset)
+    faqs = extract_faqs_from_jsonld(html)
+    if faqs:
+        return faqs
+    
+    # Mode 1 only needs text, so try it on the bytes and skip it in the DOM
+    if _has_qa_markers(body):
+        faqs = _extract_qa_from_bytes(body, charset)
+        if faqs:
+            return faqs
+    return extract_faqs_from_dom(html, _EXTRACTION_MODES[1:])
+
+def create_session() -> aiohttp.ClientSession:
+    """Creates the shared HTTP session with a pooled keep-alive connector."""
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE, limit_per_host=POOL_SIZE)
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+
+async def _read_capped(response: aiohttp.ClientResponse) -> bytes:
+    """Streams the (decompressed) body in chunks, stopping at MAX_BYTES."""
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        body += chunk
+        if len(body) >= MAX_BYTES:
+            break
+    return bytes(body[:MAX_BYTES])
+
+def _decode(body: bytes, charset: str) -> str:
+    try:
+        return body.decode(charset or "utf-8", "replace")
+    except LookupError:  # Unknown charset in the Content-Type header
+        return body.decode("utf-8", "replace")
+
+def _conditional_headers(cached) -> dict:
+    """Revalidation headers built from a cached entry's validators."""
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+async def _fetch(session: aiohttp.ClientSession, url: str, cached=None):
+    """Downloads (body, charset, validators) for a URL; body is None on 304 Not Modified."""
+    headers = _conditional_headers(cached)
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with session.get(url, headers=headers) as response:
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                if response.status == 304:
+                    return None, None, validators
+                response.raise_for_status()
+                body = await _read_capped(response)
+                return body, response.charset, validators
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+async def fetch_and_extract_all(session: aiohttp.ClientSession, url: str, cached=None):
+    """Fetches the HTML using a tiered approach and extracts (faqs, validators)."""
+    loop = asyncio.get_running_loop()
     html = ""
     faqs = []
+    validators = {"etag": None, "last_modified": None}
     
-    # Try the fastest method first (requests)
+    # Try the fastest method first (plain HTTP), conditional if we have a cached copy
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        html = response.text
-        faqs = extract_faqs_from_html(html)
+        body, charset, validators = await _fetch(session, url, cached)
+        if body is None:
+            # A 304 may leave out validators that did not change
+            return cached["faqs"], {
+                "etag": validators["etag"] or cached["etag"],
+                "last_modified": validators["last_modified"] or cached["last_modified"],
+            }
+        faqs = extract_faqs_from_body(body, charset)
         if faqs:
-            return faqs
+            return faqs, validators
     except Exception as e:
-        st.error(f"[!] Requests failed: {e}. Attempting fallback...")
+        st.error(f"[!] Request failed for {url}: {e}. Attempting fallback...")
 
     # Fallback 1: requests_html for JavaScript rendering
+    # The browser based fallbacks are blocking, so they run in the default
+    # executor to keep the other downloads going.
     if not faqs and HTMLSession:
-        st.info("Falling back to requests_html for JS rendering...")
+        st.info(f"Falling back to requests_html for JS rendering of {url}...")
         try:
-            session = HTMLSession()
-            r = session.get(url)
-            r.html.render(timeout=20, sleep=5)
-            html = r.html.html
+            html = await loop.run_in_executor(None, get_page_source_requests_html, url)
             faqs = extract_faqs_from_html(html)
             if faqs:
-                return faqs
+                return faqs, validators
         except Exception as e:
-            st.error(f"[!] requests_html failed: {e}. Attempting final fallback...")
+            st.error(f"[!] requests_html failed for {url}: {e}. Attempting final fallback...")
     
     # Final Fallback: Selenium for full browser automation
     if not faqs:
-        st.info("Falling back to Selenium for full browser automation...")
+        st.info(f"Falling back to Selenium for full browser automation of {url}...")
         try:
-            html = get_page_source_selenium(url)
+            html = await loop.run_in_executor(None, get_page_source_selenium, url)
             faqs = extract_faqs_from_html(html)
-            return faqs
+            return faqs, validators
         except Exception as e:
-            st.error(f"[!] Selenium failed: {e}.")
-            return []
+            st.error(f"[!] Selenium failed for {url}: {e}.")
+            return [], validators
 
-    return faqs
+    return faqs, validators
+
+async def fetch_and_extract_many(urls: list, cached: list = None) -> list:
+    """Extracts FAQs from several URLs concurrently, in the order given."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    cached = cached or [None] * len(urls)  # Stale cache entry (or None) per URL
+
+    async with create_session() as session:
+        async def bounded(url, entry):
+            async with semaphore:
+                return await fetch_and_extract_all(session, url, entry)
+
+        return await asyncio.gather(*[bounded(url, entry) for url, entry in zip(urls, cached)])
+
+def to_finetune_jsonl(faqs: list) -> bytes:
+    """Serializes FAQs as chat fine-tuning examples, one compact JSON per line."""
+    entries = ({"messages": [{"role": "user", "content": faq["question"]}, {"role": "assistant", "content": faq["answer"]}]} for faq in faqs)
+    if orjson:
+        return b"\n".join(orjson.dumps(entry) for entry in entries)
+    return "\n".join(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) for entry in entries).encode("utf-8")
 
 # --- Caching and Storage ---
 
-def load_faq_cache():
-    """Loads FAQs from the cache file."""
-    if os.path.exists(DATA_FILE):
+@st.cache_resource(show_spinner=False)
+def get_db():
+    """Opens the SQLite FAQ cache shared by every Streamlit session."""
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faqs (
+            url TEXT PRIMARY KEY,
+            faqs_json TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL
+        )
+    """)
+    # Caches created before revalidation existed lack this column
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(faqs)")}
+    if "last_modified" not in columns:
+        conn.execute("ALTER TABLE faqs ADD COLUMN last_modified TEXT")
+    return conn
+
+def get_faq(url: str):
+    """Returns the cache entry for a URL, or None if it was never extracted."""
+    row = get_db().execute(
+        "SELECT faqs_json, etag, last_modified, fetched_at FROM faqs WHERE url = ?", (url,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"faqs": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+
+def _cache_writer(write_q: queue.Queue):
+    """Drains queued cache writes, committing each burst in one transaction."""
+    conn = None
+    while True:
+        rows = [write_q.get()]
+        time.sleep(WRITE_COALESCE)  # Let the rest of the burst arrive
+        while True:
+            try:
+                rows.append(write_q.get_nowait())
+            except queue.Empty:
+                break
+        # Never let an error end the thread, or queued rows pile up unwritten
         try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
+            if conn is None:
+                conn = sqlite3.connect(DB_FILE, isolation_level=None)
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO faqs (url, faqs_json, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            logger.exception("Cache write of %d row(s) failed", len(rows))
+            try:
+                if conn is not None and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                conn = None  # Reconnect on the next batch
+
+@st.cache_resource(show_spinner=False)
+def get_write_queue() -> queue.Queue:
+    """Starts the background cache writer and returns the queue it drains."""
+    get_db()  # Make sure the table exists before the writer uses it
+    write_q = queue.Queue()
+    threading.Thread(target=_cache_writer, args=(write_q,), daemon=True).start()
+    return write_q
 
-def save_faq_cache(faq_store):
-    """Saves the FAQ cache to a file."""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(faq_store, f, ensure_ascii=False, indent=2)
+def put_faq(url: str, faqs: list, etag: str = None, last_modified: str = None):
+    """Queues the cached FAQs for a single URL to be inserted or replaced."""
+    get_write_queue().put((url, json.dumps(faqs, ensure_ascii=False), etag, last_modified, time.time()))
 
 # --- Streamlit UI ---
 
 st.title("Unified FAQ Extractor")
 
-faq_store = load_faq_cache()
-
-url = st.text_input("Enter a URL:")
+url_input = st.text_area("Enter one or more URLs (one per line):")
 
 if st.button("Extract FAQs"):
-    if url:
+    urls = list(dict.fromkeys(u.strip() for u in url_input.splitlines() if u.strip()))
+    if urls:
         start_time = time.time()
+        results = {}
         
-        # Check cache first
-        if url in faq_store:
-            st.info("Loaded FAQs from cache ")
-            faqs = faq_store[url]
-        else:
+        # Check cache first; entries older than CACHE_TTL get revalidated
+        pending = []
+        stale = []
+        for url in urls:
+            entry = get_faq(url)
+            if entry and time.time() - entry["fetched_at"] < CACHE_TTL:
+                results[url] = entry["faqs"]
+            else:
+                pending.append(url)
+                stale.append(entry)
+        if results:
+            st.info(f"Loaded FAQs for {len(results)} URL(s) from cache ")
+            
+        if pending:
             with st.spinner("Extracting FAQs... Please wait"):
-                faqs = fetch_and_extract_all(url)
+                extracted = asyncio.run(fetch_and_extract_many(pending, stale))
+            for url, entry, (faqs, validators) in zip(pending, stale, extracted):
                 if faqs:
-                    faq_store[url] = faqs
-                    save_faq_cache(faq_store)
+                    put_faq(url, faqs, **validators)
+                elif entry:
+                    faqs = entry["faqs"]  # Keep serving the old copy if the refresh failed
+                results[url] = faqs
 
         end_time = time.time()
         exec_time = end_time - start_time
         
-        if faqs:
+        all_faqs = []
+        for url in urls:
+            faqs = results[url]
+            if not faqs:
+                st.warning(f"No FAQs could be extracted from {url}.")
+                continue
+            all_faqs.extend(faqs)
+            
+            st.subheader(url)
             st.success(f"Successfully extracted {len(faqs)} FAQs!")
-            st.info(f"⏱ Execution Time: {exec_time:.2f} seconds")
             
             # Display FAQs
             for idx, qa in enumerate(faqs, 1):
                 with st.expander(f"Q{idx}: {qa['question']}"):
                     st.write(f"**Answer:** {qa['answer']}")
+
+        if all_faqs:
+            st.info(f"⏱ Execution Time: {exec_time:.2f} seconds")
             
             # Download buttons
-            json_file = json.dumps(faqs, indent=2, ensure_ascii=False)
+            json_file = json.dumps(all_faqs, indent=2, ensure_ascii=False)
             st.download_button(
                 label="Download FAQs as JSON",
                 data=json_file,
@@ -215,12 +613,9 @@ if st.button("Extract FAQs"):
                 mime="application/json"
             )
             
-            jsonl_lines = "\n".join([json.dumps({"messages": [{"role": "user", "content": faq["question"]}, {"role": "assistant", "content": faq["answer"]}]}) for faq in faqs])
             st.download_button(
                 label="Download FAQs as JSONL",
-                data=jsonl_lines,
+                data=to_finetune_jsonl(all_faqs),
                 file_name="faqs.jsonl",
                 mime="application/jsonl"
-            )
-        else:
-            st.warning("No FAQs could be extracted from this URL.")
\ No newline at end of file
+            )
\ No newline at end of file
@@ -1,8 +1,10 @@
 import re
 import json
-import requests
+import asyncio
+import aiohttp
 from bs4 import BeautifulSoup
 import os
+from html import unescape
 import streamlit as st
 
 try:
@@ -10,71 +12,171 @@ try:
 except ImportError:
     HTMLSession = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DATA_FILE = "faqs.jsonl"
+MAX_BYTES = 2_000_000  # Stop reading huge pages after this many bytes
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=3.05, sock_read=15)
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_NOISE_RE = re.compile(r"<\[\d+\]")
+_BRACKET_RE = re.compile(r"\[.*?\]")
 
 def clean_text(text: str) -> str:
     """Clean unwanted symbols and normalize spaces."""
-    text = re.sub(r"¶", "", text)
-    text = re.sub(r"Â", "", text)
-    text = re.sub(r"<\[\d+\]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"\xa0", " ", text)
-    text = re.sub(r"\[.*?\]", " ", text)
-    return text.strip()
-
-def fetch_html(url: str) -> str:
-    """Fetch HTML using requests, fallback to JS rendering if needed."""
+    text = text.replace("¶", "").replace("Â", "")
+    text = " ".join(_NOISE_RE.sub("", text).split())
+    return _BRACKET_RE.sub(" ", text).strip()
+
+def render_js(url: str) -> str:
+    """Render a page with requests_html. Runs in a worker thread with its own event loop."""
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    session = HTMLSession()
     try:
-        res = requests.get(url, timeout=15)
-        res.raise_for_status()
-        html = res.text
+        r = session.get(url)
+        r.html.render(timeout=20)
+        return r.html.html
+    finally:
+        session.close()
+
+def create_session() -> aiohttp.ClientSession:
+    """Shared keep-alive session: pooled connections, default headers and timeouts."""
+    connector = aiohttp.TCPConnector(limit=32, limit_per_host=32)
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+
+async def _fetch(session: aiohttp.ClientSession, url: str) -> str:
+    for attempt in range(3):
+        try:
+            async with session.get(url) as res:
+                res.raise_for_status()
+                body = bytearray()
+                async for chunk in res.content.iter_chunked(65536):
+                    body += chunk
+                    if len(body) >= MAX_BYTES:
+                        break
+                try:
+                    return body[:MAX_BYTES].decode(res.charset or "utf-8", "replace")
+                except LookupError:
+                    return body[:MAX_BYTES].decode("utf-8", "replace")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == 2:
+                raise
+            await asyncio.sleep(0.3 * 2 ** attempt)
+
+async def fetch_html(session: aiohttp.ClientSession, url: str) -> str:
+    """Fetch HTML using aiohttp, fallback to JS rendering if needed."""
+    try:
+        html = await _fetch(session, url)
     except Exception as e:
-        st.error(f"[!] Requests failed: {e}")
+        st.error(f"[!] Request failed: {e}")
         html = ""
 
-    # If JS rendering required
+    # If JS rendering required (blocking, so keep it off the event loop)
     if (("faq" in url.lower()) or not html.strip()) and HTMLSession:
         try:
-            session = HTMLSession()
-            r = session.get(url)
-            r.html.render(timeout=20)
-            html = r.html.html
+            loop = asyncio.get_running_loop()
+            html = await loop.run_in_executor(None, render_js, url)
         except Exception as e:
             st.error(f"[!] JS rendering failed: {e}")
     return html
 
+_NOISE_TAGS = ("head", "script", "style", "nav", "footer", "header", "form", "noscript", "iframe", "button", "input", "aside", "svg", "canvas", "link", "meta")
+# Common ids/classes for noise removal
+_NOISY_NAMES = ("footer","header","nav","toc","sidebar","masthead","menu","cookies","ads","advertisement","promo","newsletter")
+# Case-insensitive substring match on id or class, e.g. [id*="footer" i]
+_NOISY_SELECTOR = ", ".join(f'[{attr}*="{name}" i]' for attr in ("id", "class") for name in _NOISY_NAMES)
+_HEADINGS = ("h2", "h3", "h4")
+_ANSWER_STOP_TAGS = ("h2", "h3", "h4", "dt", "div")
+_ANSWER_TAGS = ("p", "dd", "ul", "ol")
+_QA_RE = re.compile(r"Q[:\-]?\s*(.*?)\n\s*A[:\-]?\s*(.*?)(?=\nQ[:\-]|\Z)", re.S | re.I)
+
 def remove_noise(soup):
-    for tag in soup(["head", "script", "style", "nav", "footer", "header",  "form", "noscript", "iframe", "button", "input",  "aside", "svg", "canvas", "link", "meta"]):
+    for tag in soup(_NOISE_TAGS):
         tag.decompose()
 
-    # Common ids/classes for noise removal
-    noisy = ["footer","header","nav","toc","sidebar","masthead","menu","cookies","ads","advertisement","promo","newsletter"]
-    for nid in noisy:
-        for tag in soup.find_all(id=lambda x: x and nid in x.lower()):
-            tag.decompose()
-        for tag in soup.find_all(class_=lambda x: x and nid in x.lower()):
+    # One pass over the tree instead of a lambda per keyword per attribute
+    for tag in soup.select(_NOISY_SELECTOR):
+        if not tag.decomposed:  # Already gone with a noisy ancestor
             tag.decompose()
     return soup
 
 # ----------------- FAQ Extraction -----------------
-def extract_faq(url: str):
-    html = fetch_html(url)
+def _faq_key(q: str, a: str) -> int:
+    """Cheap dedup key: hash of the lowercased first 128 chars of Q and A."""
+    return hash((q[:128].lower(), a[:128].lower()))
+
+_JSONLD_RE = re.compile(r"<script[^>]+application/ld\+json[^>]*>(.*?)</script>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def _iter_jsonld_questions(node):
+    """Yield every schema.org Question object inside parsed JSON-LD."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _iter_jsonld_questions(item)
+    elif isinstance(node, dict):
+        node_type = node.get("@type")
+        if node_type == "Question" or (isinstance(node_type, list) and "Question" in node_type):
+            yield node
+            return
+        for value in node.values():
+            yield from _iter_jsonld_questions(value)
+
+def _jsonld_text(value) -> str:
+    """Strip markup and entities from a JSON-LD text field."""
+    return clean_text(unescape(_TAG_RE.sub(" ", str(value or ""))))
+
+def extract_jsonld_faqs(html: str):
+    """Mode 0: FAQPage structured data, read from the raw HTML without building a DOM."""
+    faqs = []
+    for match in _JSONLD_RE.finditer(html):
+        try:
+            # strict=False: raw newlines inside answer strings are common
+            data = json.loads(match.group(1), strict=False)
+        except ValueError:
+            continue
+        for question in _iter_jsonld_questions(data):
+            answer = question.get("acceptedAnswer") or question.get("suggestedAnswer")
+            if isinstance(answer, list):
+                answer = answer[0] if answer else None
+            if not isinstance(answer, dict):
+                continue
+            q = _jsonld_text(question.get("name"))
+            a = _jsonld_text(answer.get("text"))
+            if q and a:
+                faqs.append({"Q": q, "A": a})
+    return faqs
+
+async def extract_faq(url: str):
+    async with create_session() as session:
+        html = await fetch_html(session, url)
     if not html:
         return []
 
-    soup = BeautifulSoup(html, "html.parser")
+    faqs = extract_jsonld_faqs(html)
+    if faqs:
+        return faqs
+
+    soup = BeautifulSoup(html, "lxml")
     remove_noise(soup)
 
     faqs = []
-    seen_q, seen_a = set(), set()
+    seen = set()
 
     # Mode A: "Q: ... A: ..." pattern in raw text
     text = soup.get_text("\n")
-    qa_pairs = re.findall(r"Q[:\-]?\s*(.*?)\n\s*A[:\-]?\s*(.*?)(?=\nQ[:\-]|\Z)", text, flags=re.S | re.I)
+    qa_pairs = _QA_RE.findall(text)
     for q, a in qa_pairs:
         q, a = clean_text(q), clean_text(a)
-        if q and a and q not in seen_q and a not in seen_a:
-            seen_q.add(q); seen_a.add(a)
+        key = _faq_key(q, a)
+        if q and a and key not in seen:
+            seen.add(key)
             faqs.append({"Q": q, "A": a})
 
     # Mode B: <dl><dt>/<dd>
@@ -82,28 +184,45 @@ def extract_faq(url: str):
         dd = dt.find_next_sibling("dd")
         if dd:
             q, a = clean_text(dt.get_text()), clean_text(dd.get_text())
-            if q and a and q not in seen_q and a not in seen_a:
-                seen_q.add(q); seen_a.add(a)
+            key = _faq_key(q, a)
+            if q and a and key not in seen:
+                seen.add(key)
                 faqs.append({"Q": q, "A": a})
 
     # Mode C: Headings (<h2>/<h3>/<h4>) + following content
-    for heading in soup.find_all(["h2", "h3", "h4"]):
+    for heading in soup.find_all(_HEADINGS):
         q = clean_text(heading.get_text())
-        if not q or q in seen_q:
+        if not q:
             continue
         answer_parts = []
         for sibling in heading.find_next_siblings():
-            if sibling.name in ["h2","h3","h4","dt","div"]:
+            if sibling.name in _ANSWER_STOP_TAGS:
                 break
-            if sibling.name in ["p","dd","ul","ol"]:
+            if sibling.name in _ANSWER_TAGS:
                 answer_parts.append(clean_text(sibling.get_text(" ", strip=True)))
         a = " ".join(answer_parts)
-        if a and a not in seen_a:
-            seen_q.add(q); seen_a.add(a)
+        key = _faq_key(q, a)
+        if a and key not in seen:
+            seen.add(key)
             faqs.append({"Q": q, "A": a})
 
     return faqs
 
+def to_finetune_jsonl(faqs) -> bytes:
+    """One compact chat-format example per line; orjson when available."""
+    entries = (
+        {
+            "messages": [
+                {"role": "user", "content": faq_item["Q"]},
+                {"role": "assistant", "content": faq_item["A"]}
+            ]
+        }
+        for faq_item in faqs
+    )
+    if orjson:
+        return b"\n".join(orjson.dumps(entry) for entry in entries)
+    return "\n".join(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) for entry in entries).encode("utf-8")
+
 # ----------------- Storage -----------------
 if os.path.exists(DATA_FILE):
     try:
@@ -130,7 +249,7 @@ if url:
         faqs = faq_store[url]
     else:
         with st.spinner("Extracting FAQs..."):
-            faqs = extract_faq(url)
+            faqs = asyncio.run(extract_faq(url))
             faq_store[url] = faqs
             save_faq_store()
             st.success(f"Extracted {len(faqs)} FAQs and cached.")
@@ -160,18 +279,8 @@ if url:
 
         # Download as Fine-tuning JSONL
         # This converts the {"Q": q, "A": a} format to {"messages": [{"role": "user", "content": q}, {"role": "assistant", "content": a}]}
-        fine_tuning_jsonl_lines = []
-        for faq_item in faqs:
-            entry = {
-                "messages": [
-                    {"role": "user", "content": faq_item["Q"]},
-                    {"role": "assistant", "content": faq_item["A"]}
-                ]
-            }
-            fine_tuning_jsonl_lines.append(json.dumps(entry, ensure_ascii=False))
-
         st.download_button(
             label="Download FAQs as JSONL",
-            data="\n".join(fine_tuning_jsonl_lines),
+            data=to_finetune_jsonl(faqs),
             file_name="faqs.jsonl",
         )